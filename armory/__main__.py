@@ -15,9 +15,6 @@ import os
 import re
 import sys
 
-import docker
-from jsonschema import ValidationError
-
 import armory
 
 from armory.logs import log
@@ -25,9 +22,6 @@ from armory.logs import log
 from armory import paths
 from armory import arguments
 from armory.configuration import load_global_config, save_config
-from armory.eval import Evaluator
-from armory.docker import images
-from armory.utils.configuration import load_config, load_config_stdin
 from armory.utils.version import to_docker_tag
 import armory.logs
 
@@ -81,6 +75,8 @@ class Command(argparse.Action):
 
 class DockerImage(argparse.Action):
     def __call__(self, parser, namespace, values, option_string=None):
+        from armory.docker import images
+
         if values in images.ALL:
             setattr(namespace, self.dest, values)
         elif values.lower() in images.IMAGE_MAP:
@@ -197,6 +193,8 @@ def _docker_image(parser):
 
 
 def _docker_image_optional(parser):
+    from armory.docker import images
+
     parser.add_argument(
         "--docker-image",
         default=images.PYTORCH,
@@ -347,6 +345,11 @@ def run(command_args, prog, description) -> int:
     args = parser.parse_args(command_args)
     armory.logs.update_filters(args.log_level, args.debug)
 
+    from jsonschema import ValidationError
+
+    from armory.eval import Evaluator
+    from armory.utils.configuration import load_config, load_config_stdin
+
     try:
         if args.filepath == "-":
             if sys.stdin.isatty():
@@ -403,6 +406,10 @@ def run(command_args, prog, description) -> int:
 
 
 def _pull_docker_images(docker_client=None):
+    import docker
+
+    from armory.docker import images
+
     if docker_client is None:
         docker_client = docker.from_env(version="auto")
     for image in images.ALL:
@@ -468,6 +475,8 @@ def download(command_args, prog, description):
     log.info("Downloading requested datasets and model weights...")
     config = {"sysconfig": {"docker_image": args.docker_image}}
 
+    from armory.eval import Evaluator
+
     rig = Evaluator(config)
     cmd = "; ".join(
         [
@@ -668,6 +677,8 @@ def launch(command_args, prog, description):
     _set_gpus(config, args.use_gpu, args.no_gpu, args.gpus)
     (config, args) = arguments.merge_config_and_args(config, args)
 
+    from armory.eval import Evaluator
+
     rig = Evaluator(config, root=args.root)
 
     # this is the expected meaning of `launch()` that is, start an interactive session even if `--interactive` was not specified
@@ -716,6 +727,8 @@ def exec(command_args, prog, description):
     _set_gpus(config, args.use_gpu, args.no_gpu, args.gpus)
     (config, args) = arguments.merge_config_and_args(config, args)
 
+    from armory.eval import Evaluator
+
     rig = Evaluator(config, root=args.root)
     exit_code = rig.run(command=command)
     sys.exit(exit_code)
@@ -770,18 +783,22 @@ def main() -> int:
         print(to_docker_tag(armory.__version__))
         sys.exit(0)
 
-    parser = argparse.ArgumentParser(prog="armory", usage=usage())
-    parser.add_argument(
-        "command",
-        metavar="<command>",
-        type=str,
-        help="armory command",
-        action=Command,
-    )
-    args = parser.parse_args(sys.argv[1:2])
+    command = sys.argv[1]
+    if command not in COMMANDS:
+        # Only build the top-level parser to report an invalid command;
+        #     each command constructs its own parser when dispatched
+        parser = argparse.ArgumentParser(prog="armory", usage=usage())
+        parser.add_argument(
+            "command",
+            metavar="<command>",
+            type=str,
+            help="armory command",
+            action=Command,
+        )
+        parser.parse_args(sys.argv[1:2])
 
-    func, description = COMMANDS[args.command]
-    prog = f"{PROGRAM} {args.command}"
+    func, description = COMMANDS[command]
+    prog = f"{PROGRAM} {command}"
     return func(sys.argv[2:], prog, description)
 
 
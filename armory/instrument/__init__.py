@@ -1,5 +1,6 @@
 from armory.instrument.config import MetricsLogger
 from armory.instrument.instrument import (
+    BoundProbe,
     FileWriter,
     LogWriter,
     Hub,
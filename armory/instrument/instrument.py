@@ -17,6 +17,10 @@ Example:
         x_post = model_preprocessor(x)
         probe.update(lambda x: x.detach().cpu().numpy(), x_post=x_post)
 
+        # if computing the value itself is expensive, guard the update
+        if probe.any_measuring("x_post"):
+            probe.update(lambda x: x.detach().cpu().numpy(), x_post=model_preprocessor(x))
+
         # outside of model code
         probe.hook(model, lambda x: x.detach().cpu().numpy(), x_post=x_post)
 
@@ -28,6 +32,7 @@ Example:
         hub.connect_meter(meter)
         hub.connect_writer(instrument.PrintWriter())
 """
+import armory.logs
 import armory.paths
 
 try:
@@ -36,6 +41,14 @@ try:
 except ImportError:
     json_utils = None
 
+try:
+    # If available, enable optional orjson encoding in FileWriter
+    import orjson
+except ImportError:
+    orjson = None
+
+import collections
+import functools
 import json
 
 from armory import log
@@ -65,19 +78,45 @@ class Probe:
         sink - sink object for probe updates; must implement 'is_measuring' and 'update'
             Currently, the Hub and MockSink objects satisfy this interface
         """
-        if name:
-            if not all(token.isidentifier() for token in name.split(".")):
-                raise ValueError(f"name {name} must be '' or '.'-separated identifiers")
         self.name = name
-        self.sink = sink
+        self.set_sink(sink)
         self._hooks = {}
         self._warned = False
 
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        if name:
+            if not all(token.isidentifier() for token in name.split(".")):
+                raise ValueError(f"name {name} must be '' or '.'-separated identifiers")
+        self._name = name
+        # cache of {update_name: probe_variable}, e.g. {"x_post": "model.x_post"}
+        #     replaced (not cleared) on rename, as copies of the probe may share it
+        self._key_cache = {}
+
+    @property
+    def sink(self):
+        return self._sink
+
+    @sink.setter
+    def sink(self, sink):
+        self.set_sink(sink)
+
     def set_sink(self, sink):
         """
         Sink must implement 'is_measuring' and 'update' APIs
         """
-        self.sink = sink
+        self._sink = sink
+        # Bind sink methods once to avoid attribute lookups on each update
+        if sink is None:
+            self._is_measuring = None
+            self._sink_update = None
+        else:
+            self._is_measuring = sink.is_measuring
+            self._sink_update = sink.update
 
     def update(self, *preprocessing, **named_values):
         """
@@ -92,29 +131,77 @@ class Probe:
         probe.update(data_point=(x_i, is_poisoned)) would enable downstream meters
             to measure (x_i, is_poisoned) from f"{probe.name}.data_point"
         """
-        if self.sink is None:
+        sink_update = self._sink_update
+        if sink_update is None:
             if not self._warned:
                 log.warning(f"No sink set up for probe {self.name}!")
                 self._warned = True
             return
 
-        for name in named_values:
-            if not name.isidentifier():
-                raise ValueError(
-                    f"named_values must be valid python identifiers, not {name}"
-                )
+        # No intermediate dict is built; each probe variable name is computed
+        #     once per update name and unmeasured names are skipped immediately
+        key_cache = self._key_cache
+        # Validate all new names before pushing any values to the sink
+        for k in named_values:
+            if k not in key_cache:
+                self._probe_variable(k)
+
+        is_measuring = self._is_measuring
+        for k, value in named_values.items():
+            name = key_cache[k]
+            if not is_measuring(name):
+                continue
+
+            # Apply value preprocessing
+            for p in preprocessing:
+                value = p(value)
+            # Push to sink
+            sink_update(name, value)
+
+    def _probe_variable(self, name):
+        """
+        Validate the update name and return the probe variable, caching the result
+            Prepends the probe name, if not empty
+        """
+        if not name.isidentifier():
+            raise ValueError(
+                f"named_values must be valid python identifiers, not {name}"
+            )
+        probe_variable = f"{self.name}.{name}" if self.name else name
+        self._key_cache[name] = probe_variable
+        return probe_variable
 
-        # Prepend probe name
-        if self.name != "":
-            named_values = {f"{self.name}.{k}": v for k, v in named_values.items()}
+    def any_measuring(self, *names):
+        """
+        Return True if the sink is measuring any of the given update names
+
+        Intended for guarding expensive value computation before an update:
+            if probe.any_measuring("x_post"):
+                probe.update(lambda x: x.detach().cpu().numpy(), x_post=x)
+        """
+        if self.sink is None:
+            return False
+        key_cache = self._key_cache
+        is_measuring = self._is_measuring
+        for name in names:
+            probe_variable = key_cache.get(name)
+            if probe_variable is None:
+                probe_variable = self._probe_variable(name)
+            if is_measuring(probe_variable):
+                return True
+        return False
+
+    def bind_preprocessing(self, *preprocessing):
+        """
+        Return a BoundProbe that applies the given preprocessing on each update
+            Useful in loops, to avoid creating new preprocessing functions per call
 
-        for name, value in named_values.items():
-            if self.sink.is_measuring(name):
-                # Apply value preprocessing
-                for p in preprocessing:
-                    value = p(value)
-                # Push to sink
-                self.sink.update(name, value)
+        Example:
+            probe = get_probe("model").bind_preprocessing(lambda x: x.detach().cpu().numpy())
+            ...
+            probe.update(x_post=x_post)
+        """
+        return BoundProbe(self, *preprocessing)
 
     def hook(self, module, *preprocessing, input=None, output=None, mode="pytorch"):
         if mode == "pytorch":
@@ -135,7 +222,9 @@ class Probe:
         # https://stackoverflow.com/questions/59493222/access-output-of-intermediate-layers-in-tensor-flow-2-0-in-eager-mode/60945216#60945216
 
     def hook_torch(self, module, *preprocessing, input=None, output=None):
-        if not hasattr(module, "register_forward_hook"):
+        try:
+            register_forward_hook = module.register_forward_hook
+        except AttributeError:
             raise ValueError(
                 f"module {module} does not have method 'register_forward_hook'. Is it a torch.nn.Module?"
             )
@@ -145,7 +234,8 @@ class Probe:
             raise ValueError(f"output {output} must be None or a non-empty string")
         if input is None and output is None:
             raise ValueError("input and output cannot both be None")
-        if module in self._hooks:
+        # key by id to avoid potentially expensive __hash__ / __eq__ on modules
+        if id(module) in self._hooks:
             raise ValueError(f"module {module} is already hooked")
 
         def hook_fn(hook_module, hook_input, hook_output):
@@ -157,11 +247,12 @@ class Probe:
                 key_values[output] = hook_output
             self.update(*preprocessing, **key_values)
 
-        hook = module.register_forward_hook(hook_fn)
-        self._hooks[module] = (hook, "pytorch")
+        hook = register_forward_hook(hook_fn)
+        # keep a module reference so its id is not reused while hooked
+        self._hooks[id(module)] = (module, hook, "pytorch")
 
     def unhook(self, module):
-        hook, mode = self._hooks.pop(module)
+        _, hook, mode = self._hooks.pop(id(module))
         if mode == "pytorch":
             hook.remove()
         elif mode == "tf":
@@ -170,6 +261,28 @@ class Probe:
             raise ValueError(f"mode {mode} not in ('pytorch', 'tf')")
 
 
+class BoundProbe:
+    """
+    Wrapper around a Probe with fixed preprocessing, created via `bind_preprocessing`
+    """
+
+    def __init__(self, probe, *preprocessing):
+        for p in preprocessing:
+            if not callable(p):
+                raise ValueError(f"preprocessing {p} must be callable")
+        self.probe = probe
+        self.preprocessing = preprocessing
+
+    def update(self, **named_values):
+        """
+        Measure values, applying the bound preprocessing if a meter is available
+        """
+        self.probe.update(*self.preprocessing, **named_values)
+
+    def any_measuring(self, *names):
+        return self.probe.any_measuring(*names)
+
+
 class MockSink:
     """
     Measures all probe inputs and prints to screen
@@ -186,11 +299,13 @@ class MockSink:
         print(f"update probe variable {probe_variable} to {value}")
 
 
+@functools.lru_cache(maxsize=256)
 def process_meter_arg(arg: str):
     """
     Helper function for ProbeMapper
 
     Return the probe variable and stage_filter
+        Results are memoized, as meter args are fixed configuration strings
 
     Example strings: 'model.x2[adversarial]', 'scenario.y_pred'
     """
@@ -219,6 +334,8 @@ class ProbeMapper:
     def __init__(self):
         # nested dicts - {probe_variable: {stage_filter: [(meter, arg)]}}
         self.probe_filter_meter_arg = {}
+        # lazily populated - {(probe_variable, stage): ((meter, arg), ...)}
+        self._resolved = {}
 
     def __len__(self):
         """
@@ -237,6 +354,7 @@ class ProbeMapper:
         """
         Connect meter to probes; idempotent
         """
+        self._resolved.clear()
         for arg in meter.get_arg_names():
             probe_variable, stage_filter = process_meter_arg(arg)
             if probe_variable not in self.probe_filter_meter_arg:
@@ -256,6 +374,7 @@ class ProbeMapper:
         """
         Disconnect meter from probes; idempotent
         """
+        self._resolved.clear()
         for arg in meter.get_arg_names():
             probe_variable, stage_filter = process_meter_arg(arg)
             if probe_variable not in self.probe_filter_meter_arg:
@@ -275,12 +394,20 @@ class ProbeMapper:
 
     def map_probe_update_to_meter_input(self, probe_variable, stage):
         """
-        Return a list of (meter, arg) that are using the current probe_variable
+        Return a tuple of (meter, arg) that are using the current probe_variable
+            Results are cached until the next connect or disconnect
         """
+        key = (probe_variable, stage)
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
+
         filter_map = self.probe_filter_meter_arg.get(probe_variable, {})
-        meters = filter_map.get(stage, [])
+        meters = tuple(filter_map.get(stage, ()))
         if stage is not None:
-            meters = meters + filter_map.get(None, [])  # no stage filter (default)
+            meters += tuple(filter_map.get(None, ()))  # no stage filter (default)
+        self._resolved[key] = meters
         return meters
 
 
@@ -308,6 +435,8 @@ class Hub:
     def __init__(self):
         self.context = dict(batch=-1, stage="")
         self.mapper = ProbeMapper()
+        # probe variables watched by at least one meter, regardless of stage
+        self._active_vars = frozenset()
         self.meters = []
         self.writers = []
         self.default_writers = []
@@ -341,6 +470,8 @@ class Hub:
 
     # is_measuring and update implement the sink interface
     def is_measuring(self, probe_variable):
+        if probe_variable not in self._active_vars:
+            return False
         return bool(
             self.mapper.map_probe_update_to_meter_input(
                 probe_variable, self.context["stage"]
@@ -369,9 +500,11 @@ class Hub:
 
         self.meters.append(meter)
         self.mapper.connect_meter(meter)
+        self._active_vars = frozenset(self.mapper.probe_filter_meter_arg)
 
     def disconnect_meter(self, meter):
         self.mapper.disconnect_meter(meter)
+        self._active_vars = frozenset(self.mapper.probe_filter_meter_arg)
         if meter in self.meters:
             self.meters.remove(meter)
 
@@ -443,10 +576,21 @@ class Hub:
         for meter in self.meters:
             meter.finalize()
 
+        # Close every writer, even if one fails, so buffered output is not lost
+        #     The first error is re-raised and later ones are only logged
+        error = None
         for writer in self.writers:
-            writer.close()
+            try:
+                writer.close()
+            except Exception as e:
+                if error is None:
+                    error = e
+                else:
+                    log.error(f"Failed to close writer {writer}: {e}")
 
         self.closed = True
+        if error is not None:
+            raise error
 
 
 class Meter:
@@ -553,21 +697,25 @@ class Meter:
         Return True if all values have been set and batch numbers match
             if raise_error is True, raise ValueError instead of returning False
         """
-        if not all(self.values_set):
+        # list.__contains__ and list.count run in C, avoiding generator overhead
+        if False in self.values_set:
             if raise_error:
                 raise ValueError(f"Not all values have been set: {self.values_set}")
             return False
-        if any(self.arg_batch_indices[0] != batch for batch in self.arg_batch_indices):
+        batches = self.arg_batch_indices
+        if batches and batches.count(batches[0]) != len(batches):
             if raise_error:
-                raise ValueError(
-                    "Batch numbers are mismatched: {self.arg_batch_indices}"
-                )
+                raise ValueError(f"Batch numbers are mismatched: {batches}")
             return False
         return True
 
     def measure(self, clear_values=True):
         self.is_ready(raise_error=True)
-        result = self.metric(*self.values, **self.metric_kwargs)
+        # Calls without the empty **kwargs expansion are notably faster in CPython
+        if self.metric_kwargs:
+            result = self.metric(*self.values, **self.metric_kwargs)
+        else:
+            result = self.metric(*self.values)
         record = (self.name, self.arg_batch_indices[0], result)
         # Assume metric is sample-wise, but computed on a batch of samples
         try:
@@ -672,6 +820,8 @@ class Writer:
         and write them to the desired output (e.g., print to screen, log to file)
 
     Subclasses implement the writing functionality and should override `_write`
+        Alternatively, `write` can be overridden directly to avoid the extra call
+            per record, in which case it must also check `self.closed`
         If subclasses manage resources like files that need to be closed,
             `_close` should be overridden to implement that functionality
     """
@@ -699,12 +849,16 @@ class Writer:
 
 
 class NullWriter(Writer):
-    def _write(self, name, batch, result):
-        pass
+    def write(self, record):
+        if self.closed:
+            raise ValueError("Cannot write to closed Writer")
 
 
 class PrintWriter(Writer):
-    def _write(self, name, batch, result):
+    def write(self, record):
+        if self.closed:
+            raise ValueError("Cannot write to closed Writer")
+        name, batch, result = record
         print(f"Meter Record: name={name}, batch={batch}, result={result}")
 
 
@@ -722,6 +876,9 @@ class LogWriter(Writer):
         self.log_level = log_level
 
     def _write(self, name, batch, result):
+        # avoid formatting potentially large results that would be filtered out
+        if not armory.logs.is_enabled(self.log_level, __name__):
+            return
         log.log(
             self.log_level, f"Meter Record: name={name}, batch={batch}, result={result}"
         )
@@ -730,24 +887,50 @@ class LogWriter(Writer):
 class FileWriter(Writer):
     """
     Writes a txt file with line-separated json encoded outputs
+        Output is buffered and is only guaranteed to be on disk after `close`
+
+    use_orjson - if True, encode with orjson (must be installed), falling back to the
+        json module for records it cannot encode. Faster, but output differs from the
+        json module: NaN and Infinity become null, float32 values are shortened,
+        non-ASCII characters are not escaped, and types like datetime are encoded
     """
 
-    def __init__(self, filepath, use_numpy_encoder=True):
+    BUFFER_SIZE = 2**20  # bytes
+
+    def __init__(self, filepath, use_numpy_encoder=True, use_orjson=False):
         super().__init__()
+        if use_orjson and orjson is None:
+            raise ValueError(
+                "Cannot import orjson. Install it or set use_orjson to False"
+            )
+        self.use_orjson = bool(use_orjson)
         if use_numpy_encoder:
             if json_utils is None:
                 raise ValueError("Cannot import numpy. Set use_numpy_encoder to False")
             self.numpy_encoder = json_utils.NumpyEncoder
         else:
             self.numpy_encoder = None
+        # Construct encoder once instead of on each json.dumps call
+        encoder_cls = self.numpy_encoder or json.JSONEncoder
+        self.encoder = encoder_cls(separators=(",", ":"))
+        if self.use_orjson:
+            self.orjson_option = orjson.OPT_SERIALIZE_NUMPY if use_numpy_encoder else 0
         self.filepath = filepath
-        self.file = open(self.filepath, "w")
+        self.file = open(self.filepath, "w", buffering=self.BUFFER_SIZE)
 
-    def _write(self, name, batch, result):
+    def write(self, record):
+        if self.closed:
+            raise ValueError("Cannot write to closed Writer")
+        name, batch, result = record
         record = [name, batch, result]
-        self.file.write(
-            json.dumps(record, cls=self.numpy_encoder, separators=(",", ":")) + "\n"
-        )
+        if self.use_orjson:
+            try:
+                line = orjson.dumps(record, option=self.orjson_option).decode()
+                self.file.write(line + "\n")
+                return
+            except TypeError:  # includes orjson.JSONEncodeError
+                pass
+        self.file.write(self.encoder.encode(record) + "\n")
 
     def _close(self):
         self.file.close()
@@ -767,7 +950,8 @@ class ResultsWriter(Writer):
         """
         super().__init__()
         self.sink = sink
-        self.records = []
+        # map from name to results, in original order
+        self.records = collections.defaultdict(list)
         self.output = None
         if max_record_size is not None:
             if max_record_size < -1:
@@ -777,8 +961,10 @@ class ResultsWriter(Writer):
             max_record_size = int(max_record_size)
         self.max_record_size = max_record_size
 
-    def _write(self, name, batch, result):
-        record = (name, batch, result)
+    def write(self, record):
+        if self.closed:
+            raise ValueError("Cannot write to closed Writer")
+        name, batch, result = record
         if self.max_record_size is not None:
             try:
                 json_utils.check_size(record, self.max_record_size)
@@ -788,18 +974,13 @@ class ResultsWriter(Writer):
                     f"max_record_size {self.max_record_size}. Dropping."
                 )
                 return
-        self.records.append(record)
+        self.records[name].append(result)
 
     def collate_results(self):
         """
         Return a map from name to output, in original order.
         """
-        output = {}
-        for name, batch, result in self.records:
-            if name not in output:
-                output[name] = []
-            output[name].append(result)
-        return output
+        return dict(self.records)
 
     def _close(self):
         output = self.collate_results()
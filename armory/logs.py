@@ -104,23 +104,50 @@ def duration_string(dt: datetime.timedelta) -> str:
     return duration if duration else "0s"
 
 
+@functools.lru_cache(maxsize=None)
+def is_enabled(level: str, name: str = "armory") -> bool:
+    """
+    return true if a message at level from module name passes the filters
+
+    loguru formats messages before applying sink filters, so this can be used to skip
+    building expensive messages that would be dropped
+
+    only sinks added through add_sink are honoured; other loguru handlers (e.g., the
+    pytest caplog handler) will not receive messages skipped by this check. results
+    are cached and the cache is cleared by update_filters
+    """
+    parts = name.split(".")
+    for i in range(len(parts), -1, -1):
+        key = ".".join(parts[:i])
+        if key in filters:
+            setting = filters[key]
+            if setting in (True, False):
+                return setting
+            return log.level(level).no >= log.level(setting).no
+    return True
+
+
 def update_filters(specs: List[str], armory_debug=None):
     """add or replace specs of the form module:level and restart the 0th sink"""
     global filters
     global logfile_directory
 
-    log.trace(f"update_filters {specs} armory_debug={armory_debug}")
+    log.trace("update_filters {} armory_debug={}", specs, armory_debug)
 
     if logfile_directory is not None:
         log.error("cannot update log filters once make_logfiles is called. ignoring.")
         return
 
+    if not specs and not armory_debug:
+        # filters are unchanged, so the stdout sink added at import is still valid
+        return
+
     if specs is None:
         specs = []
 
     if armory_debug:
         specs.append("armory:debug")
-        log.trace("added armory:debug to {specs}")
+        log.trace("added armory:debug to {}", specs)
 
     for spec in specs:
         if ":" in spec:
@@ -139,11 +166,12 @@ def update_filters(specs: List[str], armory_debug=None):
             log.error(f"unknown log level {spec} ignored")
             continue
 
+    is_enabled.cache_clear()
     log.remove()
     add_sink(sys.stdout, colorize=True)
 
     # TODO: I want to see this even if levels are set low, change to trace after debugging
-    log.trace(f"log levels set to {filters}")
+    log.trace("log levels set to {}", filters)
 
 
 def add_sink(sink, colorize=True):
@@ -2,6 +2,7 @@
 Test cases for armory.instrument measurement instrumentation
 """
 
+import copy
 import json
 
 import pytest
@@ -75,11 +76,37 @@ def test_probe(caplog):
     assert warning_message in caplog.text
     probe.update(x=2)
     assert caplog.text.count(warning_message) == 1
+    sink = HelperSink()
+    probe.set_sink(sink)
+    probe.update(x=3)
+    assert sink.probe_variables["NoSink.x"] == 3
+    probe.set_sink(None)
+    probe.update(x=4)
+    assert sink.probe_variables["NoSink.x"] == 3
+    sink2 = HelperSink()
+    probe.sink = sink2
+    assert probe.sink is sink2
+    probe.update(x=5)
+    assert sink2.probe_variables["NoSink.x"] == 5
+    probe.sink = None
+    probe.update(x=6)
+    assert sink2.probe_variables["NoSink.x"] == 5
+
+    # Copies must update through their own sink
+    probe.sink = sink2
+    probe_copy = copy.copy(probe)
+    probe_copy.sink = sink
+    probe_copy.update(x=7)
+    assert sink.probe_variables["NoSink.x"] == 7
+    assert sink2.probe_variables["NoSink.x"] == 5
 
     sink = HelperSink()
     probe = instrument.Probe("my.probe_name", sink)
     with pytest.raises(ValueError):
         probe.update(**{"~!=Not Valid Identifier": 3})
+    with pytest.raises(ValueError):
+        probe.update(good=1, **{"bad name": 2})
+    assert not sink.probe_variables
 
     probe = instrument.Probe(sink=sink)
     probe.update(x=1)
@@ -97,6 +124,12 @@ def test_probe(caplog):
     probe2.update(x=-5)
     assert sink.probe_variables["x"] != -5
     assert sink.probe_variables["my.name.x"] == -5
+    probe2.name = "my.new_name"
+    probe2.update(x=-6)
+    assert sink.probe_variables["my.name.x"] == -5
+    assert sink.probe_variables["my.new_name.x"] == -6
+    with pytest.raises(ValueError):
+        probe2.name = "not valid"
 
     probe.update(lambda x: x + 1, lambda x: 2 * x, z=3, w=4)
     assert sink.probe_variables["z"] == (3 + 1) * 2
@@ -117,6 +150,48 @@ def test_probe(caplog):
         probe.hook(jax_model, mode="jax")
 
 
+def test_probe_any_measuring():
+    instrument.del_globals()
+    probe = instrument.Probe("my.name")
+    assert not probe.any_measuring("x")
+
+    sink = HelperSink()
+    probe.set_sink(sink)
+    assert probe.any_measuring("x")
+    assert probe.any_measuring("x", "y")
+    with pytest.raises(ValueError):
+        probe.any_measuring("~!=Not Valid Identifier")
+    sink._is_measuring = False
+    assert not probe.any_measuring("x", "y")
+
+    hub = instrument.Hub()
+    probe.set_sink(hub)
+    hub.connect_meter(instrument.Meter("m", lambda x: x, "my.name.y[benign]"))
+    assert not probe.any_measuring("x", "y")
+    hub.set_context(stage="benign")
+    assert not probe.any_measuring("x")
+    assert probe.any_measuring("x", "y")
+
+
+def test_bound_probe():
+    instrument.del_globals()
+    sink = HelperSink()
+    probe = instrument.Probe("my.name", sink=sink)
+    bound = probe.bind_preprocessing(lambda x: x + 1, lambda x: 2 * x)
+    assert isinstance(bound, instrument.BoundProbe)
+    bound.update(x=3)
+    assert sink.probe_variables["my.name.x"] == (3 + 1) * 2
+    assert bound.any_measuring("x")
+
+    sink._is_measuring = False
+    assert not bound.any_measuring("x")
+    bound.update(x=5)
+    assert sink.probe_variables["my.name.x"] == (3 + 1) * 2
+
+    with pytest.raises(ValueError):
+        probe.bind_preprocessing("not callable")
+
+
 def get_pytorch_model():
     # Taken from https://pytorch.org/docs/stable/generated/torch.nn.Module.html
     import torch.nn as nn
@@ -269,6 +344,41 @@ def test_probe_mapper(caplog):
     assert len(probe_mapper) == 0
 
 
+def test_probe_mapper_resolved_cache():
+    probe_mapper = instrument.ProbeMapper()
+    meter1 = MockMeter("scenario.x")
+    probe_mapper.connect_meter(meter1)
+
+    # mutating the returned value does not change the mapper
+    meters = probe_mapper.map_probe_update_to_meter_input("scenario.x", None)
+    with pytest.raises((TypeError, AttributeError)):
+        meters.append((MockMeter(), "scenario.x"))
+    meters += ((MockMeter(), "scenario.x"),)
+    assert len(probe_mapper) == 1
+    assert probe_mapper.map_probe_update_to_meter_input("scenario.x", None) == (
+        (meter1, "scenario.x"),
+    )
+    assert probe_mapper.probe_filter_meter_arg["scenario.x"][None] == [
+        (meter1, "scenario.x")
+    ]
+
+    # cache for the same (probe_variable, stage) key is cleared on connect
+    assert (
+        len(probe_mapper.map_probe_update_to_meter_input("scenario.x", "benign")) == 1
+    )
+    meter2 = MockMeter("scenario.x[benign]")
+    probe_mapper.connect_meter(meter2)
+    meters = probe_mapper.map_probe_update_to_meter_input("scenario.x", "benign")
+    assert len(meters) == 2
+    assert (meter2, "scenario.x[benign]") in meters
+
+    # and on disconnect
+    probe_mapper.disconnect_meter(meter1)
+    meters = probe_mapper.map_probe_update_to_meter_input("scenario.x", "benign")
+    assert meters == ((meter2, "scenario.x[benign]"),)
+    assert probe_mapper.map_probe_update_to_meter_input("scenario.x", None) == ()
+
+
 class LastRecordWriter(instrument.Writer):
     """
     Mock test interface for Writer
@@ -289,6 +399,29 @@ class LastRecordWriter(instrument.Writer):
         self.num_closes += 1
 
 
+class FailingCloseWriter(LastRecordWriter):
+    def close(self):
+        super().close()
+        raise OSError("close failed")
+
+
+def test_hub_close_writer_error(caplog):
+    hub = instrument.Hub()
+    w1 = FailingCloseWriter()
+    w2 = LastRecordWriter()
+    w3 = FailingCloseWriter()
+    hub.connect_writer(w1)
+    hub.connect_writer(w2)
+    hub.connect_writer(w3)
+    with pytest.raises(OSError):
+        hub.close()
+    assert w1.num_closes == 1
+    assert w2.num_closes == 1
+    assert w3.num_closes == 1
+    assert hub.closed
+    assert caplog.text.count("Failed to close writer") == 1
+
+
 def test_hub(caplog):
     Hub = instrument.Hub
     hub = Hub()
@@ -383,7 +516,9 @@ def test_hub(caplog):
     assert hub.closed
 
     hub.disconnect_meter(m1)
+    assert hub.is_measuring("a")
     hub.disconnect_meter(m2)
+    assert not hub.is_measuring("a")
     assert len(hub.meters) == 0
 
 
@@ -439,7 +574,7 @@ def test_meter(caplog):
 
     m.set("b", 4, 1)
     assert not m.is_ready()
-    with pytest.raises(ValueError):
+    with pytest.raises(ValueError, match=r"Batch numbers are mismatched: \[0, 1\]"):
         m.is_ready(raise_error=True)
 
     m.clear()
@@ -578,6 +713,9 @@ def test_null_writer(capsys):
     captured = capsys.readouterr()
     assert not captured.out
     assert not captured.err
+    writer.close()
+    with pytest.raises(ValueError):
+        writer.write(("empty", 0, None))
 
 
 def test_print_writer(capsys):
@@ -603,6 +741,29 @@ def test_log_writer(caplog):
         writer = instrument.LogWriter(log_level="NOT A LEVEL")
 
 
+def test_log_writer_filtered(monkeypatch):
+    from armory import logs
+
+    class Result:
+        num_formats = 0
+
+        def __format__(self, format_spec):
+            Result.num_formats += 1
+            return "result"
+
+    monkeypatch.setattr(logs, "filters", {"": "WARNING", "armory": "INFO"})
+    logs.is_enabled.cache_clear()
+    try:
+        writer = instrument.LogWriter(log_level="DEBUG")
+        writer.write(("filtered", 0, Result()))
+        assert Result.num_formats == 0
+        writer = instrument.LogWriter(log_level="INFO")
+        writer.write(("not filtered", 0, Result()))
+        assert Result.num_formats == 1
+    finally:
+        logs.is_enabled.cache_clear()
+
+
 @pytest.mark.docker_required
 def test_file_writer(tmp_path):
     filepath = tmp_path / "file_writer_output.txt"
@@ -633,6 +794,37 @@ def test_file_writer(tmp_path):
         assert json.loads(line_a) == a
         assert json.loads(line_c) == c[:2] + [list(c[2])]
 
+    # default output does not depend on whether orjson is installed
+    d = ["d", 1, [float("nan"), np.float32(0.1), "\u00e9"]]
+    writer = instrument.FileWriter(filepath, use_numpy_encoder=True)
+    writer.write(d)
+    writer.close()
+    with open(filepath) as f:
+        assert f.read() == '["d",1,[NaN,0.10000000149011612,"\\u00e9"]]\n'
+
+    if instrument.orjson is None:
+        with pytest.raises(ValueError):
+            instrument.FileWriter(filepath, use_orjson=True)
+    else:
+        # orjson output matches the json module for standard records
+        records = [a, b, c, ["e", None, {"key": [1.5, -2, True, None]}]]
+        outputs = []
+        for use_orjson in (False, True):
+            writer = instrument.FileWriter(filepath, use_orjson=use_orjson)
+            for record in records:
+                writer.write(record)
+            writer.close()
+            with open(filepath) as f:
+                outputs.append(f.read())
+        assert outputs[0] == outputs[1]
+
+        # fall back to json module for records orjson cannot encode
+        writer = instrument.FileWriter(filepath, use_orjson=True)
+        writer.write(["f", 1, {1: "non-str key"}])
+        writer.close()
+        with open(filepath) as f:
+            assert f.read() == '["f",1,{"1":"non-str key"}]\n'
+
     # mock a numpy import error
     json_utils = instrument.json_utils
     instrument.json_utils = None
@@ -1,3 +1,4 @@
+from armory import logs
 from armory.logs import log
 
 # test the loguru based logs module for proper pytest caplog behavior
@@ -27,3 +28,19 @@ def test_error_function(caplog):
     for record in caplog.records:
         assert record.levelname == "ERROR"
     assert "wally" in caplog.text
+
+
+def test_is_enabled(monkeypatch):
+    monkeypatch.setattr(
+        logs, "filters", {"": "WARNING", "armory": "INFO", "armory.off": False}
+    )
+    logs.is_enabled.cache_clear()
+    try:
+        assert logs.is_enabled("INFO")
+        assert not logs.is_enabled("DEBUG")
+        assert logs.is_enabled("INFO", "armory.instrument.instrument")
+        assert not logs.is_enabled("CRITICAL", "armory.off.module")
+        assert not logs.is_enabled("INFO", "other")
+        assert logs.is_enabled("WARNING", "other")
+    finally:
+        logs.is_enabled.cache_clear()